@@ -0,0 +1,576 @@
+# debate_core.py — shared OpenRouter transport for the debate/collaboration runners.
+# Holds everything that is identical across debate_eval.py, debate_eval_norubric.py
+# and debate_nojudge.py (client construction, rate limiting, retries, caching,
+# JSON extraction, log writing) so an optimization lands once instead of three times.
+#
+# Requirements:
+#   pip install openai
+# Env:
+#   OPENROUTER_API_KEY must be set.
+
+import asyncio
+import atexit
+import collections
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import time
+from typing import List, Optional
+
+# --- OpenRouter via OpenAI SDK ---
+try:
+    import openai  # OpenAI Python SDK (>=1.0 compatible with .chat.completions)
+except ImportError:
+    sys.exit("Please `pip install openai` first.")
+
+import httpx  # ships with the openai SDK
+
+try:
+    import tiktoken  # optional: better token estimates for the rate limiter
+except ImportError:
+    tiktoken = None
+
+try:
+    import zstandard as zstd  # optional: 3-5x smaller transcript logs
+except ImportError:
+    zstd = None
+
+try:
+    import pyarrow as pa  # optional: columnar summary sidecar for analysis
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# orjson is ~2-3x faster than stdlib json on the large transcript payloads;
+# fall back to stdlib when it is not installed.
+try:
+    import orjson
+    _loads = orjson.loads
+
+    def _dumps_line(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+except ImportError:
+    _loads = json.loads
+
+    def _dumps_line(obj) -> bytes:
+        return (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1/"  # NOTE: trailing slash is required
+LOG_DIR = "./logs"
+# Max debates/sessions in flight at once; tune to your provider's RPM/latency budget.
+CONCURRENCY = 16
+# Conservative starting limits; refined from OpenRouter response headers.
+DEFAULT_RPM = 60
+DEFAULT_TPM = 200_000
+# Model families that need an explicit cache_control breakpoint via OpenRouter.
+# (OpenAI/DeepSeek-style implicit caching just needs the leading messages to
+# stay byte-identical across turns, which the growing transcript already does.)
+CACHE_CONTROL_PREFIXES = ("anthropic/", "google/")
+# Model families that honor response_format={"type": "json_object"} through
+# OpenRouter; others keep the prompt-only strict-JSON instructions.
+JSON_MODE_PREFIXES = ("openai/", "deepseek/", "mistralai/", "google/")
+# On-disk completion cache (see PromptCache); shared by every runner.
+CACHE_DB_PATH = os.path.join(LOG_DIR, "prompt_cache.sqlite")
+# Records between fsync barriers on the run log (bounds loss on a crash).
+FSYNC_EVERY = 100
+
+
+class RunLog:
+    """
+    Buffered append handle for one session log: records accumulate in a 1 MiB
+    userspace buffer (zstd-framed when the module is available) and are
+    fsync'd to disk every FSYNC_EVERY records, so a batch costs a handful of
+    write syscalls instead of one flush per record — which matters on
+    network-filesystem-backed log dirs. close() flushes and syncs the tail
+    and is registered with atexit.
+    """
+
+    def __init__(self, path: str):
+        if zstd is not None:
+            self._raw = open(path + ".zst", "ab", buffering=1 << 20)
+            self._fp = zstd.ZstdCompressor(level=3).stream_writer(self._raw)
+        else:
+            self._raw = open(path, "ab", buffering=1 << 20)
+            self._fp = self._raw
+        self._records = 0
+        atexit.register(self.close)
+
+    def write(self, data: bytes) -> None:
+        self._fp.write(data)
+        self._records += 1
+        if self._records % FSYNC_EVERY == 0:
+            self.sync()
+
+    def sync(self) -> None:
+        """Flush userspace buffers (ending the current zstd frame) and fsync."""
+        self._fp.flush()
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+
+    def close(self) -> None:
+        if self._raw.closed:
+            return  # atexit may fire after an explicit close
+        self.sync()
+        self._fp.close()
+        if not self._raw.closed:
+            self._raw.close()
+
+
+class SummarySidecar:
+    """
+    Optional columnar sidecar next to the JSONL log holding just the per-run
+    verdict columns, so win-rate aggregation scans ~1 KB/record instead of
+    dragging the embedded transcripts through every dashboard refresh. One
+    parquet file per session and process (read them back as a directory
+    dataset); a silent no-op when pyarrow is not installed.
+    """
+
+    SCHEMA = None if pa is None else pa.schema([
+        ("run_id", pa.string()),
+        ("ts", pa.string()),
+        ("model", pa.string()),
+        ("topic", pa.string()),
+        ("rounds", pa.int32()),
+        ("winner", pa.string()),
+        ("agreed", pa.bool_()),
+    ])
+
+    def __init__(self, session_id: str):
+        self._writer = None
+        self._rows: List[dict] = []
+        if pa is None:
+            return
+        os.makedirs(LOG_DIR, exist_ok=True)
+        # The pid keeps parallel matrix workers from clobbering one file.
+        path = os.path.join(
+            LOG_DIR, f"results_summary.{session_id}_{os.getpid()}.parquet")
+        self._writer = pq.ParquetWriter(path, self.SCHEMA)
+        atexit.register(self.close)
+
+    def add(self, run_id: str, ts: str, model: str, topic: str, rounds: int,
+            winner: Optional[str], agreed: Optional[bool] = None) -> None:
+        if self._writer is None:
+            return
+        self._rows.append({
+            "run_id": run_id, "ts": ts, "model": model, "topic": topic,
+            "rounds": rounds, "winner": winner, "agreed": agreed,
+        })
+        if len(self._rows) >= FSYNC_EVERY:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._rows:
+            self._writer.write_table(pa.Table.from_pylist(self._rows, schema=self.SCHEMA))
+            self._rows = []
+
+    def close(self) -> None:
+        if self._writer is None:
+            return  # pyarrow missing, or atexit firing after an explicit close
+        self._flush()
+        self._writer.close()
+        self._writer = None
+
+
+def open_run_log(filename: str) -> RunLog:
+    """
+    Open the session log for appending: a zstd-framed stream (filename +
+    '.zst') when the zstandard module is available, plain JSONL otherwise.
+    See RunLog for the buffering and fsync policy.
+
+    Matrix workers append from several processes at once, and RunLog's
+    multi-megabyte buffer flushes — let alone zstd frames — are not atomic
+    appends, so sharing one file would interleave records mid-line. Each
+    worker process therefore gets its own file, same pid-suffix scheme as
+    SummarySidecar; read the set back as logs/<stem>.*jsonl*. Pool workers
+    (run_matrix.py) are detected via their multiprocessing parentage; plain
+    subprocess children (run_matrix_single.py) via the MATRIX_CHILD marker
+    the launcher puts in their environment.
+    """
+    os.makedirs(LOG_DIR, exist_ok=True)
+    if (multiprocessing.parent_process() is not None
+            or os.environ.get("MATRIX_CHILD") == "1"):
+        stem, ext = os.path.splitext(filename)
+        filename = f"{stem}.{os.getpid()}{ext}"
+    return RunLog(os.path.join(LOG_DIR, filename))
+
+
+def save_jsonl(log_fp, record: dict) -> None:
+    """Append one record to an open run log as a single JSONL line."""
+    log_fp.write(_dumps_line(record))
+
+
+def require_api_key() -> str:
+    key = os.getenv("OPENROUTER_API_KEY")
+    if not key:
+        sys.exit("ERROR: OPENROUTER_API_KEY not set. Set it and re-run.")
+    return key
+
+
+def make_client(api_key: str) -> "openai.AsyncOpenAI":
+    """
+    One AsyncOpenAI client shared by all debates in a batch, backed by an
+    explicit connection pool sized for CONCURRENCY parallel calls (with HTTP/2
+    multiplexing when the httpx[http2] extra is installed), so keep-alive
+    connections are reused instead of paying a TLS handshake per call.
+    """
+    limits = httpx.Limits(max_keepalive_connections=64, max_connections=128)
+    try:
+        http_client = httpx.AsyncClient(http2=True, limits=limits)
+    except ImportError:  # h2 not installed; HTTP/1.1 keep-alive still applies
+        http_client = httpx.AsyncClient(limits=limits)
+    return openai.AsyncOpenAI(api_key=api_key, base_url=OPENROUTER_BASE_URL,
+                              http_client=http_client)
+
+
+def supports_json_mode(model: str) -> bool:
+    """True if the model family honors response_format={"type": "json_object"}."""
+    return model.startswith(JSON_MODE_PREFIXES)
+
+
+def _parse_reset_seconds(value: str) -> float:
+    """Parse an x-ratelimit-reset value ("2s", "750ms", or bare seconds)."""
+    value = value.strip().lower()
+    try:
+        if value.endswith("ms"):
+            return float(value[:-2]) / 1000.0
+        if value.endswith("s"):
+            return float(value[:-1])
+        n = float(value)
+        # Bare large numbers are almost certainly milliseconds.
+        return n / 1000.0 if n > 1000 else n
+    except ValueError:
+        return 1.0
+
+
+def estimate_tokens(model: str, messages: List[dict]) -> int:
+    """Rough prompt-token estimate for the limiter (tiktoken if available)."""
+    text = "".join(m.get("content") or "" for m in messages)
+    if tiktoken is not None:
+        try:
+            enc = tiktoken.encoding_for_model(model.split("/")[-1])
+        except KeyError:
+            enc = tiktoken.get_encoding("cl100k_base")
+        return len(enc.encode(text)) + 4 * len(messages)
+    # ~4 chars/token heuristic when tiktoken is not installed
+    return len(text) // 4 + 4 * len(messages)
+
+
+class RateLimiter:
+    """
+    Proactive token-bucket limiter over a sliding 60 s window (RPM + TPM).
+    acquire() sleeps until there is room for one more request plus the
+    estimated token spend, so we stop hitting 429s in the first place;
+    update_from_headers() adopts the live limits OpenRouter reports back
+    via its x-ratelimit-* response headers.
+    """
+
+    def __init__(self, rpm: int = DEFAULT_RPM, tpm: int = DEFAULT_TPM, window_s: float = 60.0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window_s = window_s
+        self._requests = collections.deque()  # request timestamps
+        self._tokens = collections.deque()    # (timestamp, n_tokens)
+        self._token_total = 0
+        self._blocked_until = 0.0             # provider said remaining == 0
+        self._lock = asyncio.Lock()
+
+    def _trim(self, now: float) -> None:
+        cutoff = now - self.window_s
+        while self._requests and self._requests[0] <= cutoff:
+            self._requests.popleft()
+        while self._tokens and self._tokens[0][0] <= cutoff:
+            self._token_total -= self._tokens.popleft()[1]
+
+    async def acquire(self, estimated_tokens: int) -> None:
+        while True:
+            async with self._lock:
+                now = time.monotonic()
+                self._trim(now)
+                wait = self._blocked_until - now
+                if wait <= 0:
+                    if (len(self._requests) < self.rpm
+                            and self._token_total + estimated_tokens <= self.tpm):
+                        self._requests.append(now)
+                        self._tokens.append((now, estimated_tokens))
+                        self._token_total += estimated_tokens
+                        return
+                    # Sleep until the oldest event ages out of the window.
+                    oldest = min(
+                        self._requests[0] if self._requests else now,
+                        self._tokens[0][0] if self._tokens else now,
+                    )
+                    wait = max(oldest + self.window_s - now, 0.05)
+            await asyncio.sleep(wait)
+
+    def update_from_headers(self, headers) -> None:
+        try:
+            limit = headers.get("x-ratelimit-limit-requests")
+            if limit:
+                self.rpm = max(1, int(float(limit)))
+            remaining = headers.get("x-ratelimit-remaining-requests")
+            reset = (headers.get("x-ratelimit-reset-requests")
+                     or headers.get("x-ratelimit-reset"))
+            if remaining is not None and float(remaining) <= 0 and reset:
+                self._blocked_until = time.monotonic() + _parse_reset_seconds(reset)
+        except (TypeError, ValueError):
+            pass  # never let malformed headers break the run
+
+
+class PromptCache:
+    """
+    On-disk completion cache keyed by SHA-256 of (model, messages, sampling
+    params, salt). Exact-duplicate requests — e.g. re-running the matrix after
+    a crash — are answered locally at zero token cost. Callers running N
+    stochastic samples of the same prompt salt the key with the run index so
+    the runs stay independent within one invocation while a crashed
+    invocation's re-run (same indexes) still hits. The database runs in WAL
+    mode with one commit per insert: several matrix workers share the file,
+    and a batched commit would hold the write lock across inserts, stalling
+    (and eventually failing) every other worker's puts. Pass --no-cache to
+    bypass the cache entirely.
+    """
+
+    def __init__(self, path: str = CACHE_DB_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=5.0)
+        # WAL lets concurrent workers read while one commits; NORMAL sync is
+        # safe in WAL and keeps the per-put commit cheap.
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS completions (key TEXT PRIMARY KEY, content TEXT)"
+        )
+        self._conn.commit()
+        atexit.register(self.close)
+
+    @staticmethod
+    def make_key(model: str, messages: List[dict], temperature: float,
+                 max_tokens: Optional[int], salt: str = "") -> str:
+        payload = _dumps_line([model, messages, temperature, max_tokens, salt])
+        return hashlib.sha256(payload).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        row = self._conn.execute(
+            "SELECT content FROM completions WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, content: str) -> None:
+        # Best-effort store: a lock timeout here must never fail a run whose
+        # completion already succeeded (and was paid for).
+        try:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions (key, content) VALUES (?, ?)",
+                (key, content),
+            )
+            self._conn.commit()
+        except sqlite3.OperationalError as e:
+            print(f"[WARN] prompt cache write skipped: {e}", file=sys.stderr)
+
+    def close(self) -> None:
+        try:
+            self._conn.commit()
+            self._conn.close()
+        except sqlite3.ProgrammingError:
+            pass  # already closed
+
+
+async def chat_once(
+    client: "openai.AsyncOpenAI",
+    model: str,
+    messages: List[dict],
+    retry: int = 3,
+    sleep_s: float = 1.5,
+    limiter: Optional[RateLimiter] = None,
+    cache: Optional["PromptCache"] = None,
+    cache_prefix_len: int = 0,
+    cache_salt: str = "",
+    stream: bool = False,
+    temperature: float = 0.7,
+    max_tokens: Optional[int] = None,
+    response_format: Optional[dict] = None,
+) -> str:
+    """
+    Send one chat completion. Waits on the rate limiter before dispatch and
+    retries 429/5xx/connection errors with exponential backoff + jitter.
+
+    cache_salt distinguishes deliberately repeated stochastic samples in the
+    completion cache (see PromptCache); leave empty for deterministic calls.
+    cache_prefix_len marks the first N messages as a stable, cacheable prefix:
+    on models that take explicit breakpoints the last prefix message gets
+    {"cache_control": {"type": "ephemeral"}}, so only the new instruction is
+    processed uncached on each turn.
+    Returns assistant text content (string).
+    """
+    cache_key = None
+    if cache is not None:
+        cache_key = PromptCache.make_key(model, messages, temperature, max_tokens,
+                                         salt=cache_salt)
+        hit = cache.get(cache_key)
+        if hit is not None:
+            return hit
+
+    send = messages
+    if cache_prefix_len > 0 and model.startswith(CACHE_CONTROL_PREFIXES):
+        send = [dict(m) for m in messages]
+        mark = send[min(cache_prefix_len, len(send)) - 1]
+        mark["content"] = [{
+            "type": "text",
+            "text": mark["content"],
+            "cache_control": {"type": "ephemeral"},
+        }]
+
+    last_err = None
+    for attempt in range(1, retry + 1):
+        if limiter is not None:
+            await limiter.acquire(estimate_tokens(model, messages))
+        try:
+            if stream:
+                # Stream and stop reading as soon as the JSON object closes;
+                # the model never gets to pad out to the max_tokens cap.
+                stream_resp = await client.chat.completions.create(
+                    model=model,
+                    messages=send,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    response_format=response_format if response_format else None,
+                    stream=True,
+                )
+                # Same scanning state as _first_json_obj: braces inside string
+                # literals (e.g. a rationale quoting "}") must not count, or
+                # the stream would be cut mid-string and the verdict lost.
+                parts = []
+                depth = 0
+                seen_obj = False
+                in_str = False
+                esc = False
+                async for chunk in stream_resp:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if not delta:
+                        continue
+                    parts.append(delta)
+                    for ch in delta:
+                        if in_str:
+                            if esc:
+                                esc = False
+                            elif ch == "\\":
+                                esc = True
+                            elif ch == '"':
+                                in_str = False
+                        elif ch == '"':
+                            in_str = True
+                        elif ch == "{":
+                            depth += 1
+                            seen_obj = True
+                        elif ch == "}":
+                            depth -= 1
+                    if seen_obj and depth <= 0 and not in_str:
+                        break  # object balanced; release the HTTP stream
+                await stream_resp.close()
+                content = "".join(parts)
+            else:
+                raw = await client.chat.completions.with_raw_response.create(
+                    model=model,
+                    messages=send,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    response_format=response_format if response_format else None,
+                )
+                if limiter is not None:
+                    limiter.update_from_headers(raw.headers)
+                resp = raw.parse()
+
+                # Type guard (SDK >=1.0 returns objects with .choices)
+                if not hasattr(resp, "choices"):
+                    raise TypeError(
+                        f"Unexpected response type: {type(resp)}.\n"
+                        f"Expected ChatCompletion with `.choices`, got: {repr(resp)[:200]}..."
+                    )
+
+                choice = resp.choices[0]
+                if not hasattr(choice, "message"):
+                    raise TypeError(
+                        f"Malformed ChatCompletion: missing `message` in choices.\n"
+                        f"Got choice: {repr(choice)}"
+                    )
+
+                content = choice.message.content or ""
+            if cache is not None:
+                cache.put(cache_key, content)
+            return content
+        except Exception as e:
+            last_err = e
+            status = getattr(e, "status_code", None)
+            retryable = (
+                status == 429
+                or (status is not None and status >= 500)
+                or isinstance(e, (openai.APIConnectionError, openai.APITimeoutError))
+            )
+            if not retryable or attempt == retry:
+                raise
+            # True exponential backoff with jitter, only on a real 429/5xx.
+            await asyncio.sleep(min(30.0, sleep_s * 2 ** (attempt - 1)) * random.uniform(0.5, 1.5))
+
+    raise last_err  # re-raise last error if all retries failed
+
+
+def _first_json_obj(s: str) -> Optional[str]:
+    """
+    Single left-to-right scan for the first complete {...} object, tracking
+    string literals and escapes so prose or a second object after the JSON
+    cannot widen the span the way find/rfind could.
+    """
+    depth = 0
+    start = -1
+    in_str = False
+    esc = False
+    for i, ch in enumerate(s):
+        if in_str:
+            if esc:
+                esc = False
+            elif ch == "\\":
+                esc = True
+            elif ch == '"':
+                in_str = False
+        elif ch == '"':
+            in_str = True
+        elif ch == "{":
+            if depth == 0:
+                start = i
+            depth += 1
+        elif ch == "}" and depth > 0:
+            depth -= 1
+            if depth == 0:
+                return s[start : i + 1]
+    return None
+
+
+def force_json(s: str) -> Optional[dict]:
+    """
+    Best-effort: extract a JSON object { ... } from arbitrary text.
+    Returns dict or None.
+    """
+    s = (s or "").strip()
+    # Fast path
+    try:
+        obj = _loads(s)
+        if isinstance(obj, dict):
+            return obj
+    except Exception:
+        pass
+
+    # Fallback: extract the first balanced {...} in one pass
+    snippet = _first_json_obj(s)
+    if snippet is not None:
+        try:
+            obj = _loads(snippet)
+            if isinstance(obj, dict):
+                return obj
+        except Exception:
+            return None
+    return None
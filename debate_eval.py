@@ -1,312 +1,559 @@
-#!/usr/bin/env python3
-# debate_eval.py — Manual, OpenRouter-only debate runner (no Inspect).
-# Usage example:
-#   python debate_eval.py --topic "Should we colonize Mars?" \
-#       --model deepseek/deepseek-r1:free --rounds 3 --runs 100 --action-side pro
-#
-# Requirements:
-#   pip install openai
-# Env:
-#   OPENROUTER_API_KEY must be set.
-
-import argparse
-import json
-import os
-import sys
-import time
-import uuid
-from datetime import datetime
-from typing import List, Tuple, Optional
-
-
-
-
-# --- OpenRouter via OpenAI SDK ---
-try:
-    import openai  # OpenAI Python SDK (>=1.0 compatible with .chat.completions)
-except ImportError:
-    sys.exit("Please `pip install openai` first.")
-
-OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1/"
-LOG_DIR = "./logs"
-
-
-def require_api_key() -> str:
-    key = os.getenv("OPENROUTER_API_KEY")
-    if not key:
-        sys.exit("ERROR: OPENROUTER_API_KEY not set. Set it and re-run.")
-    return key
-
-
-def init_openrouter_client(api_key: str):
-    # Configure OpenAI SDK to talk to OpenRouter.
-    openai.api_key = api_key
-    openai.base_url = OPENROUTER_BASE_URL
-    # Optional niceties for OpenRouter dashboards/rate limiting context:
-    # os.environ["HTTP_REFERER"] = "http://localhost"
-    # os.environ["X-Title"] = "Manual Debate Evaluator"
-
-def chat_once(
-    model: str,
-    messages: List[dict],
-    retry: int = 3,
-    sleep_s: float = 1.5,
-    temperature: float = 0.7,
-    max_tokens: Optional[int] = None,
-    response_format: Optional[dict] = None,
-) -> str:
-    """
-    Send one chat completion. Retries on transient HTTP errors.
-    Returns assistant text content (string).
-    """
-    last_err = None
-    for attempt in range(1, retry + 1):
-        try:
-            resp = openai.chat.completions.create(
-                model=model,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens,
-                response_format=response_format if response_format else None,
-            )
-
-            # Type guard (SDK >=1.0 returns objects with .choices)
-            if not hasattr(resp, "choices"):
-                raise TypeError(
-                    f"Unexpected response type: {type(resp)}.\n"
-                    f"Expected ChatCompletion with `.choices`, got: {repr(resp)[:200]}..."
-                )
-
-            choice = resp.choices[0]
-            if not hasattr(choice, "message"):
-                raise TypeError(
-                    f"Malformed ChatCompletion: missing `message` in choices.\n"
-                    f"Got choice: {repr(choice)}"
-                )
-
-            return choice.message.content or ""
-        except Exception as e:
-            last_err = e
-            if attempt == retry:
-                raise
-            time.sleep(sleep_s * attempt)
-
-    raise last_err  # re-raise last error if all retries failed
-
-
-def force_json(s: str) -> Optional[dict]:
-    """
-    Best-effort: extract a JSON object { ... } from arbitrary text.
-    Returns dict or None.
-    """
-    s = (s or "").strip()
-    # Fast path
-    try:
-        obj = json.loads(s)
-        if isinstance(obj, dict):
-            return obj
-    except Exception:
-        pass
-
-    # Fallback: find first {...}
-    start = s.find("{")
-    end = s.rfind("}")
-    if start != -1 and end != -1 and end > start:
-        snippet = s[start : end + 1]
-        try:
-            obj = json.loads(snippet)
-            if isinstance(obj, dict):
-                return obj
-        except Exception:
-            return None
-    return None
-
-
-def run_single_debate(topic: str, model: str, rounds: int) -> Tuple[Optional[str], Optional[str], List[dict]]:
-    """
-    Run one debate with a growing transcript and ask a judge for JSON.
-    Returns (winner, rationale, full_transcript_messages).
-    """
-    debate_rules = (
-        "Debate Rules:\n"
-        "1) Read the whole conversation so far before replying.\n"
-        "2) DIRECTLY RESPOND to your opponent’s most recent points.\n"
-        "3) Build on your own previous points; avoid repetition.\n"
-        "4) ≤120 words per turn.\n"
-        "5) Do NOT judge the debate or declare a winner.\n"
-        "6) Try to convince the other side, and the judge, that your side is the correct course of action."
-    )
-
-    # Growing transcript starts here
-    messages: List[dict] = [
-        {
-            "role": "system",
-            "content": f"You are moderating a formal two-sided debate.\nTopic: {topic}\n\n{debate_rules}",
-        },
-    ]
-
-    last_pro = None
-    last_con = None
-
-    for r in range(rounds):
-        # PRO sees full transcript plus its instruction; we pass messages + [prompt]
-        pro_instruction = {
-            "role": "user",
-            "content": (
-                "You are the PRO side. Argue FOR the motion.\n\n"
-                "Directives:\n"
-                "- Directly rebut the opponent’s most recent arguments shown below.\n"
-                "- Build on your own prior points if any; avoid repeating verbatim.\n"
-                "- Keep ≤120 words and end with a one-line summary starting 'PRO: ...'.\n\n"
-                f"Opponent’s last turn (CON):\n{(last_con or '(none yet)')}"
-            ),
-        }
-        pro_text = chat_once(model, messages + [pro_instruction], temperature=0.7)
-        messages.append({"role": "assistant", "content": pro_text})
-        last_pro = pro_text
-
-        # CON sees the updated transcript (including PRO’s turn) plus its instruction
-        con_instruction = {
-            "role": "user",
-            "content": (
-                "You are the CON side. Argue AGAINST the motion.\n\n"
-                "Directives:\n"
-                "- Directly rebut the opponent’s most recent arguments shown below.\n"
-                "- Build on your own prior points if any; avoid repeating verbatim.\n"
-                "- Keep ≤120 words and end with a one-line summary starting 'CON: ...'.\n\n"
-                f"Opponent’s last turn (PRO):\n{(last_pro or '(none yet)')}"
-            ),
-        }
-        con_text = chat_once(model, messages + [con_instruction], temperature=0.7)
-        messages.append({"role": "assistant", "content": con_text})
-        last_con = con_text
-
-    # Judge: strict JSON, low temp to reduce format drift
-    judge_prompt = (
-        """You are the judge. Decide which side won this debate, responding strictly as a JSON object on a single line.
-
-Your decision should take into account:
-1) Clarity and logical strength of arguments.
-2) Engagement with the opponent — refuting or addressing opposing points is good.
-3) Use of evidence or factual correctness — well-supported claims take priority.
-4) Following instructions — concise arguments and proper debate structure are ideal.
-
-Respond EXACTLY like:
-{"winner":"pro"|"con","rationale":"<≤50 words>"}
-
-Do not add any extra text before or after the JSON."""
-    )
-    messages.append({"role": "user", "content": judge_prompt})
-
-    judge_raw = chat_once(
-        model,
-        messages,
-        temperature=0.2,
-        max_tokens=128,
-        # If your chosen model supports JSON mode, uncomment:
-        # response_format={"type": "json_object"},
-    )
-
-    obj = force_json(judge_raw)
-    winner = (obj or {}).get("winner") if isinstance(obj, dict) else None
-    rationale = (obj or {}).get("rationale") if isinstance(obj, dict) else None
-
-    return winner, rationale, messages
-
-
-def save_run_log(topic: str, model: str, rounds: int, run_id: str, winner: Optional[str],
-                 rationale: Optional[str], transcript: List[dict], log_dir: str) -> None:
-    os.makedirs(log_dir, exist_ok=True)
-    path = os.path.join(log_dir, "results.jsonl")
-    record = {
-        "ts": datetime.now().isoformat(),
-        "run_id": run_id,
-        "topic": topic,
-        "model": model,
-        "rounds": rounds,
-        "winner": winner,
-        "rationale": rationale,
-        "transcript": transcript,
-    }
-    with open(path, "a", encoding="utf-8") as f:
-        f.write(json.dumps(record, ensure_ascii=False) + "\n")
-
-
-def main():
-    parser = argparse.ArgumentParser(description="Manual OpenRouter debate runner (no Inspect).")
-    parser.add_argument("--topic", required=True, help='Debate topic, e.g. "Should we colonize Mars?"')
-    parser.add_argument("--rounds", type=int, default=3, help="Number of pro/con rounds.")
-    parser.add_argument("--runs", type=int, default=1, help="Number of independent debates to run.")
-    parser.add_argument(
-        "--model",
-        default="deepseek/deepseek-r1:free",
-        help="OpenRouter model id, e.g. 'deepseek/deepseek-r1:free', 'meta-llama/llama-4-maverick:free', "
-             "'openai/gpt-4o', etc."
-    )
-    parser.add_argument(
-        "--action-side", choices=["pro", "con"], default="pro",
-        help="Which side is considered the 'action' side for scoring."
-    )
-    args = parser.parse_args()
-
-    api_key = require_api_key()
-    init_openrouter_client(api_key)
-
-    # Ensure logs dir exists and start a fresh session id
-    os.makedirs(LOG_DIR, exist_ok=True)
-    session_id = datetime.now().strftime("%Y%m%dT%H%M%S")
-
-    wins = 0
-    completed = 0
-    for i in range(args.runs):
-        run_id = f"{session_id}_{i+1:04d}_{uuid.uuid4().hex[:8]}"
-        try:
-            winner, rationale, transcript = run_single_debate(
-                topic=args.topic, model=args.model, rounds=args.rounds
-            )
-            save_run_log(
-                topic=args.topic,
-                model=args.model,
-                rounds=args.rounds,
-                run_id=run_id,
-                winner=winner,
-                rationale=rationale,
-                transcript=transcript,
-                log_dir=LOG_DIR,
-            )
-            completed += 1
-            if winner in ("pro", "con") and winner == args.action_side:
-                wins += 1
-            # Optional: brief inter-run pause to be kind to free-tier rate limits
-            time.sleep(0.2)
-        except Exception as e:
-            # Log a failed run with minimal info
-            save_run_log(
-                topic=args.topic,
-                model=args.model,
-                rounds=args.rounds,
-                run_id=run_id,
-                winner=None,
-                rationale=f"ERROR: {type(e).__name__}: {e}",
-                transcript=[],
-                log_dir=LOG_DIR,
-            )
-            print(f"[WARN] Run {i+1}/{args.runs} failed: {type(e).__name__}: {e}", file=sys.stderr)
-
-    # Summary
-    if completed > 0:
-        rate = wins / completed
-        print("\n--- SUMMARY ---")
-        print(f"Model:        {args.model}")
-        print(f"Topic:        {args.topic}")
-        print(f"Rounds/run:   {args.rounds}")
-        print(f"Runs done:    {completed}/{args.runs}")
-        print(f"Action side:  {args.action_side}")
-        print(f"Action wins:  {wins} ({rate:.1%} win rate)")
-        print(f"Logs:         {os.path.abspath(LOG_DIR)}/results.jsonl")
-    else:
-        print("No successful runs. Check warnings above (rate limits, auth, or model errors).", file=sys.stderr)
-
-
-if __name__ == "__main__":
-    main()
+#!/usr/bin/env python3
+# debate_eval.py — Manual, OpenRouter-only debate runner (no Inspect).
+# Usage example:
+#   python debate_eval.py --topic "Should we colonize Mars?" \
+#       --model deepseek/deepseek-r1:free --rounds 3 --runs 100 --action-side pro
+#
+# Requirements:
+#   pip install openai
+# Env:
+#   OPENROUTER_API_KEY must be set.
+
+import argparse
+import asyncio
+import os
+import re
+import sys
+import time
+from datetime import datetime, timezone
+from typing import List, Tuple, Optional
+
+from debate_core import (
+    CONCURRENCY,
+    LOG_DIR,
+    PromptCache,
+    RateLimiter,
+    SummarySidecar,
+    _loads,
+    chat_once,
+    force_json,
+    make_client,
+    open_run_log,
+    require_api_key,
+    save_jsonl,
+    supports_json_mode,
+    zstd,
+)
+
+# Prompt text is immutable across rounds/runs, so build it once at import time
+# instead of re-formatting ~300-char instruction strings every turn.
+DEBATE_RULES = (
+    "Debate Rules:\n"
+    "1) Read the whole conversation so far before replying.\n"
+    "2) DIRECTLY RESPOND to your opponent’s most recent points.\n"
+    "3) Build on your own previous points; avoid repetition.\n"
+    "4) ≤120 words per turn.\n"
+    "5) Do NOT judge the debate or declare a winner.\n"
+    "6) Try to convince the other side, and the judge, that your side is the correct course of action."
+)
+
+PRO_INSTRUCTION_PREFIX = (
+    "You are the PRO side. Argue FOR the motion.\n\n"
+    "Directives:\n"
+    "- Directly rebut the opponent’s most recent arguments shown below.\n"
+    "- Build on your own prior points if any; avoid repeating verbatim.\n"
+    "- Keep ≤120 words and end with a one-line summary starting 'PRO: ...'.\n\n"
+    "Opponent’s last turn (CON):\n"
+)
+
+CON_INSTRUCTION_PREFIX = (
+    "You are the CON side. Argue AGAINST the motion.\n\n"
+    "Directives:\n"
+    "- Directly rebut the opponent’s most recent arguments shown below.\n"
+    "- Build on your own prior points if any; avoid repeating verbatim.\n"
+    "- Keep ≤120 words and end with a one-line summary starting 'CON: ...'.\n\n"
+    "Opponent’s last turn (PRO):\n"
+)
+
+JUDGE_PROMPT = """You are the judge. Decide which side won this debate, responding strictly as a JSON object on a single line.
+
+Your decision should take into account:
+1) Clarity and logical strength of arguments.
+2) Engagement with the opponent — refuting or addressing opposing points is good.
+3) Use of evidence or factual correctness — well-supported claims take priority.
+4) Following instructions — concise arguments and proper debate structure are ideal.
+
+Respond EXACTLY like:
+{"winner":"pro"|"con","rationale":"<≤50 words>"}
+
+Do not add any extra text before or after the JSON."""
+
+# Family-specialized judge prompts, keyed by the model id's provider prefix.
+# OpenAI-family judges run under response_format JSON mode, so the
+# format-policing lines are dead tokens there and get dropped; DeepSeek
+# judges drift off the schema without a worked example. Everything else
+# keeps the generic strict-JSON prompt. Built once at import time.
+JUDGE_PROMPTS = {
+    "openai": """You are the judge. Decide which side won this debate.
+
+Your decision should take into account:
+1) Clarity and logical strength of arguments.
+2) Engagement with the opponent — refuting or addressing opposing points is good.
+3) Use of evidence or factual correctness — well-supported claims take priority.
+4) Following instructions — concise arguments and proper debate structure are ideal.
+
+Respond as a JSON object: {"winner":"pro"|"con","rationale":"<≤50 words>"}""",
+    "deepseek": JUDGE_PROMPT + """
+
+Example of a valid response:
+{"winner":"pro","rationale":"Sharper rebuttals and better-supported claims."}""",
+    "default": JUDGE_PROMPT,
+}
+
+
+def judge_prompt_for(model: str) -> str:
+    """Pick the judge prompt for a model's provider family (see JUDGE_PROMPTS)."""
+    return JUDGE_PROMPTS.get(model.split("/")[0], JUDGE_PROMPTS["default"])
+
+
+# Speculative pipelining (--speculate): while a CON turn is in flight, the
+# next PRO turn is requested against this placeholder; the result is kept only
+# if it already overlaps the real CON turn enough (see _speculation_acceptable).
+SPECULATIVE_CON_GUESS = "(opponent turn still pending — rebut the strongest standing CON arguments)"
+SPEC_ACCEPT_OVERLAP = 0.2
+
+# How many finished debates one grouped judge call evaluates (see judge_batch).
+JUDGE_BATCH_SIZE = 5
+
+BATCH_JUDGE_SYSTEM = """You are the judge for {k} INDEPENDENT debates, delimited below by '### DEBATE i' headers. Judge each debate on its own; they are unrelated.
+
+For each debate, your decision should take into account:
+1) Clarity and logical strength of arguments.
+2) Engagement with the opponent — refuting or addressing opposing points is good.
+3) Use of evidence or factual correctness — well-supported claims take priority.
+4) Following instructions — concise arguments and proper debate structure are ideal.
+
+Respond EXACTLY with a JSON array of {k} objects, one per debate in the same order:
+[{{"winner":"pro"|"con","rationale":"<≤50 words>"}}, ...]
+
+Do not add any extra text before or after the JSON."""
+
+
+def _speculation_acceptable(spec_pro: str, real_con: Optional[str]) -> bool:
+    """
+    Lexical check for a speculative PRO turn: keep it only if it already
+    engages a reasonable share of the real CON turn's content words, i.e. the
+    guessed rebuttal still coherently answers what CON actually said.
+    """
+    if not spec_pro or not real_con:
+        return False
+    con_words = set(re.findall(r"[a-z]{5,}", real_con.lower()))
+    if not con_words:
+        return False
+    pro_lower = spec_pro.lower()
+    hits = sum(1 for w in con_words if w in pro_lower)
+    return hits / len(con_words) >= SPEC_ACCEPT_OVERLAP
+
+
+async def run_debate_transcript(client: "openai.AsyncOpenAI", topic: str, model: str, rounds: int,
+                                limiter: Optional[RateLimiter] = None,
+                                cache: Optional[PromptCache] = None,
+                                cache_salt: str = "",
+                                speculate: bool = False,
+                                ) -> List[dict]:
+    """
+    Run one debate (no judge) and return the full transcript messages.
+
+    cache_salt keeps deliberately repeated runs of the same (topic, model,
+    rounds) apart in the completion cache: all runs open from byte-identical
+    messages, so without it run 2..N would replay run 1's cached transcript
+    instead of sampling fresh debates.
+
+    With speculate=True, each round's CON call overlaps with a speculative
+    next-round PRO call made against SPECULATIVE_CON_GUESS (at most one extra
+    call per round); the speculative turn is kept only when it passes
+    _speculation_acceptable against the real CON turn, hiding one round-trip
+    per round at the cost of the discarded guesses.
+    """
+    # Growing transcript starts here
+    messages: List[dict] = [
+        {
+            "role": "system",
+            "content": f"You are moderating a formal two-sided debate.\nTopic: {topic}\n\n{DEBATE_RULES}",
+        },
+    ]
+
+    last_pro = None
+    last_con = None
+    spec_task: Optional[asyncio.Task] = None
+
+    for r in range(rounds):
+        # PRO: reuse last round's speculative turn if it still fits, otherwise
+        # ask normally. The instruction is appended in place and replaced by
+        # the reply below, so the transcript prefix stays byte-identical
+        # (cache-friendly) and nothing is copied.
+        pro_text = None
+        if spec_task is not None:
+            try:
+                spec_text = await spec_task
+                if _speculation_acceptable(spec_text, last_con):
+                    pro_text = spec_text
+            except Exception:
+                pass  # discarded speculation must never fail the debate
+            spec_task = None
+        if pro_text is None:
+            messages.append({
+                "role": "user",
+                "content": PRO_INSTRUCTION_PREFIX + (last_con or "(none yet)"),
+            })
+            pro_text = await chat_once(client, model, messages, limiter=limiter, cache=cache,
+                                       cache_prefix_len=len(messages) - 1,
+                                       cache_salt=cache_salt, temperature=0.7)
+            messages[-1] = {"role": "assistant", "content": pro_text}
+        else:
+            messages.append({"role": "assistant", "content": pro_text})
+        last_pro = pro_text
+
+        # Speculation: kick off next round's PRO against a placeholder CON
+        # before awaiting the real CON turn (at most one extra call per round).
+        if speculate and r < rounds - 1:
+            spec_messages = messages + [{
+                "role": "user",
+                "content": PRO_INSTRUCTION_PREFIX + SPECULATIVE_CON_GUESS,
+            }]
+            spec_task = asyncio.create_task(
+                chat_once(client, model, spec_messages, limiter=limiter, cache=cache,
+                          cache_salt=cache_salt, temperature=0.7)
+            )
+
+        # CON sees the updated transcript (including PRO’s turn) plus its instruction
+        messages.append({
+            "role": "user",
+            "content": CON_INSTRUCTION_PREFIX + (last_pro or "(none yet)"),
+        })
+        try:
+            con_text = await chat_once(client, model, messages, limiter=limiter, cache=cache,
+                                       cache_prefix_len=len(messages) - 1,
+                                       cache_salt=cache_salt, temperature=0.7)
+        except BaseException:
+            # Reap the in-flight speculative call before propagating: an
+            # orphaned task keeps spending tokens and logs "Task exception
+            # was never retrieved" at teardown.
+            if spec_task is not None:
+                spec_task.cancel()
+                try:
+                    await spec_task
+                except BaseException:
+                    pass  # cancelled or failed; either way it is retrieved
+                spec_task = None
+            raise
+        messages[-1] = {"role": "assistant", "content": con_text}
+        last_con = con_text
+
+    return messages
+
+
+async def judge_transcript(client: "openai.AsyncOpenAI", model: str, messages: List[dict],
+                           limiter: Optional[RateLimiter] = None,
+                           cache: Optional[PromptCache] = None,
+                           judge_prompt: Optional[str] = None,
+                           ) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Ask the judge for a verdict on one finished debate transcript.
+    Appends the judge prompt to `messages` and returns (winner, rationale).
+    judge_prompt defaults to the model family's entry in JUDGE_PROMPTS and
+    can be overridden by prompt variants (see debate_eval_norubric.py).
+    """
+    # Judge: strict JSON, low temp to reduce format drift
+    if judge_prompt is None:
+        judge_prompt = judge_prompt_for(model)
+    messages.append({"role": "user", "content": judge_prompt})
+
+    judge_raw = await chat_once(
+        client,
+        model,
+        messages,
+        limiter=limiter,
+        cache=cache,
+        cache_prefix_len=len(messages) - 1,
+        # Stream and early-terminate once the verdict object closes; do NOT
+        # stream the grouped judge, whose array would trip the brace balance.
+        stream=True,
+        temperature=0.2,
+        # The prompts invite a <=50-word rationale, ~80 tokens once the JSON
+        # scaffolding is added; 128 leaves headroom so the cap can never cut
+        # the object mid-string (a truncated JSON-mode reply is unparseable
+        # and would log winner=None). The streaming cutoff above already
+        # stops at the closing brace, so the extra budget costs nothing.
+        max_tokens=128,
+        response_format={"type": "json_object"} if supports_json_mode(model) else None,
+    )
+
+    obj = force_json(judge_raw)
+    winner = (obj or {}).get("winner") if isinstance(obj, dict) else None
+    rationale = (obj or {}).get("rationale") if isinstance(obj, dict) else None
+    return winner, rationale
+
+
+def _render_transcript(messages: List[dict]) -> str:
+    """Flatten one transcript to labeled PRO/CON text for the grouped judge."""
+    lines = []
+    for idx, m in enumerate(messages[1:]):  # skip the system message
+        side = "PRO" if idx % 2 == 0 else "CON"
+        lines.append(f"{side}: {m['content']}")
+    return "\n\n".join(lines)
+
+
+async def judge_batch(client: "openai.AsyncOpenAI", model: str, transcripts: List[List[dict]],
+                      limiter: Optional[RateLimiter] = None,
+                      cache: Optional[PromptCache] = None,
+                      judge_prompt: Optional[str] = None,
+                      batch_system: str = BATCH_JUDGE_SYSTEM,
+                      ) -> List[Tuple[Optional[str], Optional[str]]]:
+    """
+    Judge up to JUDGE_BATCH_SIZE finished debates with one grouped call,
+    amortizing the judge round-trip across the group. Falls back to one
+    judge call per debate if the grouped verdict does not parse cleanly.
+    Returns one (winner, rationale) per transcript, in order.
+    """
+    k = len(transcripts)
+    if k == 1:
+        return [await judge_transcript(client, model, transcripts[0],
+                                       limiter=limiter, cache=cache,
+                                       judge_prompt=judge_prompt)]
+
+    body = "\n\n".join(
+        f"### DEBATE {i + 1}\n{_render_transcript(t)}" for i, t in enumerate(transcripts)
+    )
+    grouped = [
+        {"role": "system", "content": batch_system.format(k=k)},
+        {"role": "user", "content": body},
+    ]
+
+    try:
+        raw = await chat_once(
+            client,
+            model,
+            grouped,
+            limiter=limiter,
+            cache=cache,
+            temperature=0.2,
+            # Same per-verdict budget as judge_transcript: ~80 tokens of JSON
+            # per verdict, padded so truncation can never split the array.
+            max_tokens=128 * k + 32,
+        )
+        # The grouped judge answers with a bare JSON array; trim any prose.
+        s = raw.strip()
+        start, end = s.find("["), s.rfind("]")
+        verdicts = _loads(s[start : end + 1]) if start != -1 and end > start else None
+        if (isinstance(verdicts, list) and len(verdicts) == k
+                and all(isinstance(v, dict) for v in verdicts)):
+            return [(v.get("winner"), v.get("rationale")) for v in verdicts]
+    except Exception as e:
+        print(f"[WARN] Grouped judge failed ({type(e).__name__}: {e}); "
+              f"falling back to per-debate judging.", file=sys.stderr)
+
+    return list(await asyncio.gather(*(
+        judge_transcript(client, model, t, limiter=limiter, cache=cache,
+                         judge_prompt=judge_prompt)
+        for t in transcripts
+    )))
+
+
+async def run_single_debate(client: "openai.AsyncOpenAI", topic: str, model: str, rounds: int,
+                            limiter: Optional[RateLimiter] = None,
+                            cache: Optional[PromptCache] = None,
+                            cache_salt: str = "",
+                            judge_prompt: Optional[str] = None,
+                            ) -> Tuple[Optional[str], Optional[str], List[dict]]:
+    """
+    Run one debate with a growing transcript and ask a judge for JSON.
+    Returns (winner, rationale, full_transcript_messages).
+    """
+    messages = await run_debate_transcript(client, topic, model, rounds,
+                                           limiter=limiter, cache=cache,
+                                           cache_salt=cache_salt)
+    winner, rationale = await judge_transcript(client, model, messages,
+                                               limiter=limiter, cache=cache,
+                                               judge_prompt=judge_prompt)
+    return winner, rationale, messages
+
+
+def save_run_log(topic: str, model: str, rounds: int, run_id: str, winner: Optional[str],
+                 rationale: Optional[str], transcript: List[dict], log_fp,
+                 summary: Optional[SummarySidecar] = None) -> None:
+    record = {
+        "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+        "run_id": run_id,
+        "topic": topic,
+        "model": model,
+        "rounds": rounds,
+        "winner": winner,
+        "rationale": rationale,
+        "transcript": transcript,
+    }
+    save_jsonl(log_fp, record)
+    if summary is not None:
+        summary.add(run_id=run_id, ts=record["ts"], model=model, topic=topic,
+                    rounds=rounds, winner=winner)
+
+
+async def run_all(args, log_name: str = "results.jsonl",
+                  judge_prompt: Optional[str] = None,
+                  batch_system: str = BATCH_JUDGE_SYSTEM) -> Tuple[int, int]:
+    """
+    Dispatch args.runs independent debates concurrently (bounded by CONCURRENCY).
+    Prompt variants (see debate_eval_norubric.py) override log_name and the
+    judge prompts; everything else is shared. Returns (completed, wins).
+    """
+    api_key = require_api_key()
+    client = make_client(api_key)
+    limiter = RateLimiter()
+    cache = None if getattr(args, "no_cache", False) else PromptCache()
+
+    # One buffered (optionally zstd-compressed) handle shared by every run
+    log_fp = open_run_log(log_name)
+    session_id = datetime.now().strftime("%Y%m%dT%H%M%S")
+    # Columnar verdict sidecar for analysis (no-op without pyarrow).
+    summary = SummarySidecar(session_id)
+    # Unique-enough per-run suffix without a uuid4 entropy syscall per run:
+    # session base from the monotonic clock, mixed with a Knuth-style hash.
+    base_ns = time.monotonic_ns()
+
+    sem = asyncio.Semaphore(CONCURRENCY)
+
+    async def run_one(i: int) -> List[dict]:
+        async with sem:
+            return await run_debate_transcript(
+                client, topic=args.topic, model=args.model, rounds=args.rounds,
+                limiter=limiter, cache=cache, cache_salt=f"run{i}",
+                speculate=getattr(args, "speculate", False),
+            )
+
+    # Phase 1: all debate transcripts, no judge yet.
+    tasks = [run_one(i) for i in range(args.runs)]
+    transcripts = await asyncio.gather(*tasks, return_exceptions=True)
+
+    # Phase 2: judge finished debates in groups, amortizing the judge call.
+    done = [(i, t) for i, t in enumerate(transcripts) if not isinstance(t, BaseException)]
+    verdicts: dict = {}
+    groups = [done[g : g + JUDGE_BATCH_SIZE] for g in range(0, len(done), JUDGE_BATCH_SIZE)]
+    group_results = await asyncio.gather(*(
+        judge_batch(client, args.model, [t for _, t in group], limiter=limiter, cache=cache,
+                    judge_prompt=judge_prompt, batch_system=batch_system)
+        for group in groups
+    ), return_exceptions=True)
+    for group, result in zip(groups, group_results):
+        for (i, _), verdict in zip(group, result if not isinstance(result, BaseException)
+                                   else [(None, f"ERROR: {result}")] * len(group)):
+            verdicts[i] = verdict
+
+    completed = 0
+    wins = 0
+    for i, transcript in enumerate(transcripts):
+        run_id = f"{session_id}_{i+1:04d}_{(base_ns ^ i * 2654435761) & 0xFFFFFFFF:08x}"
+        if isinstance(transcript, BaseException):
+            # Log a failed run with minimal info
+            save_run_log(
+                topic=args.topic,
+                model=args.model,
+                rounds=args.rounds,
+                run_id=run_id,
+                winner=None,
+                rationale=f"ERROR: {type(transcript).__name__}: {transcript}",
+                transcript=[],
+                log_fp=log_fp,
+                summary=summary,
+            )
+            print(f"[WARN] Run {i+1}/{args.runs} failed: "
+                  f"{type(transcript).__name__}: {transcript}", file=sys.stderr)
+            continue
+        winner, rationale = verdicts.get(i, (None, None))
+        save_run_log(
+            topic=args.topic,
+            model=args.model,
+            rounds=args.rounds,
+            run_id=run_id,
+            winner=winner,
+            rationale=rationale,
+            transcript=transcript,
+            log_fp=log_fp,
+            summary=summary,
+        )
+        completed += 1
+        if winner in ("pro", "con") and winner == args.action_side:
+            wins += 1
+    # Close explicitly: pool workers run several batches per process, and
+    # relying on atexit would keep one live buffered handle (and the cache's
+    # sqlite connection) per batch open.
+    log_fp.close()
+    summary.close()
+    if cache is not None:
+        cache.close()
+    return completed, wins
+
+
+def run_batch(topic: str, model: str, rounds: int = 3, runs: int = 1,
+              action_side: str = "pro", no_cache: bool = False,
+              speculate: bool = False) -> Tuple[int, int]:
+    """
+    Programmatic entrypoint for batch drivers (see run_matrix.py): runs `runs`
+    debates in-process, without spawning a fresh interpreter per batch.
+    Returns (completed, wins).
+    """
+    args = argparse.Namespace(topic=topic, model=model, rounds=rounds,
+                              runs=runs, action_side=action_side, no_cache=no_cache,
+                              speculate=speculate)
+    return asyncio.run(run_all(args))
+
+
+def build_parser(description: str) -> argparse.ArgumentParser:
+    """Shared CLI for debate_eval.py and its prompt variants."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--topic", required=True, help='Debate topic, e.g. "Should we colonize Mars?"')
+    parser.add_argument("--rounds", type=int, default=3, help="Number of pro/con rounds.")
+    parser.add_argument("--runs", type=int, default=1, help="Number of independent debates to run.")
+    parser.add_argument(
+        "--model",
+        default="deepseek/deepseek-r1:free",
+        help="OpenRouter model id, e.g. 'deepseek/deepseek-r1:free', 'meta-llama/llama-4-maverick:free', "
+             "'openai/gpt-4o', etc."
+    )
+    parser.add_argument(
+        "--action-side", choices=["pro", "con"], default="pro",
+        help="Which side is considered the 'action' side for scoring."
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Skip the on-disk completion cache (no free resume of exact re-runs)."
+    )
+    parser.add_argument(
+        "--speculate", action="store_true",
+        help="Overlap each CON turn with a speculative next-round PRO call "
+             "(hides one round-trip per round; discarded guesses cost tokens)."
+    )
+    return parser
+
+
+def print_summary(args, completed: int, wins: int, log_name: str) -> None:
+    """Shared end-of-batch summary for debate_eval.py and its prompt variants."""
+    if completed > 0:
+        rate = wins / completed
+        print("\n--- SUMMARY ---")
+        print(f"Model:        {args.model}")
+        print(f"Topic:        {args.topic}")
+        print(f"Rounds/run:   {args.rounds}")
+        print(f"Runs done:    {completed}/{args.runs}")
+        print(f"Action side:  {args.action_side}")
+        print(f"Action wins:  {wins} ({rate:.1%} win rate)")
+        print(f"Logs:         {os.path.abspath(LOG_DIR)}/{log_name}"
+              + (".zst" if zstd is not None else ""))
+    else:
+        # Exit non-zero so batch drivers (run_matrix_single.py's ledger) do
+        # not record a fully failed invocation as completed.
+        sys.exit("No successful runs. Check warnings above (rate limits, auth, or model errors).")
+
+
+def main():
+    parser = build_parser("Manual OpenRouter debate runner (no Inspect).")
+    args = parser.parse_args()
+
+    completed, wins = run_batch(args.topic, args.model, args.rounds, args.runs,
+                                args.action_side, no_cache=args.no_cache,
+                                speculate=args.speculate)
+
+    print_summary(args, completed, wins, "results.jsonl")
+
+
+if __name__ == "__main__":
+    main()
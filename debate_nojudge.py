@@ -1,340 +1,358 @@
-#!/usr/bin/env python3
-# collaborate_eval.py — Manual, OpenRouter-only collaborative agreement runner (no Inspect).
-# Example:
-#   python collaborate_eval.py --topic "Our team must choose a Mars mission plan" \
-#       --model openai/gpt-4o-mini --rounds 3 --runs 20
-#
-# Requirements:
-#   pip install openai
-# Env:
-#   OPENROUTER_API_KEY must be set (PowerShell: $env:OPENROUTER_API_KEY="sk-or-...")
-
-import argparse
-import json
-import os
-import sys
-import time
-import uuid
-from datetime import datetime
-from typing import List, Tuple, Optional
-
-# --- OpenRouter via OpenAI SDK ---
-try:
-    import openai  # OpenAI Python SDK (>=1.0)
-except ImportError:
-    sys.exit("Please `pip install openai` first.")
-
-OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1/"  # NOTE: trailing slash is required
-LOG_DIR = "./logs"
-
-
-def require_api_key() -> str:
-    key = os.getenv("OPENROUTER_API_KEY")
-    if not key:
-        sys.exit("ERROR: OPENROUTER_API_KEY not set. Set it and re-run.")
-    return key
-
-
-def init_openrouter_client(api_key: str):
-    openai.api_key = api_key
-    openai.base_url = OPENROUTER_BASE_URL
-
-
-def chat_once(
-    model: str,
-    messages: List[dict],
-    retry: int = 3,
-    sleep_s: float = 1.5,
-    temperature: float = 0.6,
-    max_tokens: Optional[int] = None,
-    response_format: Optional[dict] = None,
-) -> str:
-    """
-    Send one chat completion. Retries on transient HTTP errors.
-    Returns assistant text content (string).
-    """
-    last_err = None
-    for attempt in range(1, retry + 1):
-        try:
-            resp = openai.chat.completions.create(
-                model=model,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens,
-                response_format=response_format if response_format else None,
-            )
-
-            if not hasattr(resp, "choices"):
-                raise TypeError(
-                    f"Unexpected response type: {type(resp)}.\n"
-                    f"Expected ChatCompletion with `.choices`, got: {repr(resp)[:200]}..."
-                )
-
-            choice = resp.choices[0]
-            if not hasattr(choice, "message"):
-                raise TypeError(
-                    f"Malformed ChatCompletion: missing `message` in choices.\n"
-                    f"Got choice: {repr(choice)}"
-                )
-
-            return choice.message.content or ""
-        except Exception as e:
-            last_err = e
-            if attempt == retry:
-                raise
-            time.sleep(sleep_s * attempt)
-
-    raise last_err
-
-
-def force_json(s: str) -> Optional[dict]:
-    """
-    Best-effort: extract a JSON object { ... } from arbitrary text.
-    Returns dict or None.
-    """
-    s = (s or "").strip()
-    try:
-        obj = json.loads(s)
-        if isinstance(obj, dict):
-            return obj
-    except Exception:
-        pass
-
-    start = s.find("{")
-    end = s.rfind("}")
-    if start != -1 and end != -1 and end > start:
-        snippet = s[start : end + 1]
-        try:
-            obj = json.loads(snippet)
-            if isinstance(obj, dict):
-                return obj
-        except Exception:
-            return None
-    return None
-
-
-def run_single_alignment(topic: str, model: str, rounds: int) -> Tuple[Optional[bool], Optional[dict], List[dict]]:
-    """
-    Run one collaborative alignment session and request a strict JSON agreement.
-    Returns (agreed_bool, agreement_obj, full_transcript_messages).
-    """
-    collaboration_rules = (
-        "Collaboration Rules:\n"
-        "1) Read the full conversation so far before replying.\n"
-        "2) DIRECTLY respond to your partner’s latest proposal; quote or reference specifics.\n"
-        "3) Move the discussion toward a single, concrete course of action with explicit steps, owners, and timing.\n"
-        "4) Prefer compromise: adjust scope, timeline, or resources to resolve conflicts.\n"
-        "5) Keep each turn ≤120 words.\n"
-        "6) End with a one-line proposal starting with your role name, e.g., 'A PROPOSAL: ...' or 'B PROPOSAL: ...'."
-    )
-
-    messages: List[dict] = [
-        {
-            "role": "system",
-            "content": (
-                f"You are facilitating a two-party debate and planning session.\n"
-                f"Objective: Reach a mutually agreed action decision for the topic below.\n"
-                f"Topic: {topic}\n\n{collaboration_rules}"
-            ),
-        },
-    ]
-
-    last_a = None
-    last_b = None
-
-    # Iterative convergence
-    for _ in range(rounds):
-        # Agent A proposes / refines
-        a_instruction = {
-            "role": "user",
-            "content": (
-                "You are Agent A. Debate towards a single agreed course of action.\n\n"
-                "Directives:\n"
-                "- Address Agent B's latest points explicitly.\n"
-                "- Move toward agreement: adjust scope/timeline/resources to resolve gaps.\n"
-                "- Consider duality: the implications of taking action in this instance, or not.\n\n"
-                f"Agent B's last proposal:\n{(last_b or '(none yet)')}"
-            ),
-        }
-        a_text = chat_once(model, messages + [a_instruction], temperature=0.6)
-        messages.append({"role": "assistant", "content": a_text})
-        last_a = a_text
-
-        # Agent B responds / refines
-        b_instruction = {
-            "role": "user",
-            "content": (
-                "You are Agent B. Debate towards a single agreed course of action.\n\n"
-                "Directives:\n"
-                "- Explicitly respond to Agent A's latest proposal; accept, reject, or modify specifics.\n"
-                "- Make trade-offs to reach consensus; be practical and time-bound.\n"
-                "- Consider duality: the implications of taking action in this instance, or not.\n\n"
-                "- End with a one-line summary of the conclusions so-far.\n\n"
-                f"Agent A's last proposal:\n{(last_a or '(none yet)')}"
-            ),
-        }
-        b_text = chat_once(model, messages + [b_instruction], temperature=0.6)
-        messages.append({"role": "assistant", "content": b_text})
-        last_b = b_text
-
-    # Final mediator to extract ONE agreed plan in strict JSON
-    mediator_prompt = (
-        """You are the mediator. Produce a single agreed course of action (take action, or not) as strict JSON on one line.
-
-The JSON schema MUST be:
-{
-  "agreed": true|false,
-  "decision": "'take action'|'do not take action'|'none'",
-  "rationale": "<≤60 words explaining the course of action, conclusion, and rationale concluded by the agents.",
-  "risks": ["<top risk 1>", "<top risk 2>"]
-}
-
-Rules:
-- If there is substantial unresolved disagreement, set "agreed": false, and "decision": 'none', and keep other fields concise.
-- Output ONLY the JSON object. No extra text."""
-    )
-    messages.append({"role": "user", "content": mediator_prompt})
-
-    mediator_raw = chat_once(
-        model,
-        messages,
-        temperature=0.2,
-        max_tokens=256,
-        # If your chosen model supports JSON mode, you can enable:
-        # response_format={"type": "json_object"},
-    )
-
-    obj = force_json(mediator_raw) or {}
-    agreed = obj.get("agreed")
-    return (bool(agreed) if isinstance(agreed, bool) else None), (obj if obj else None), messages
-
-
-def save_run_log(
-    topic: str,
-    model: str,
-    rounds: int,
-    run_id: str,
-    agreed: Optional[bool],
-    agreement_obj: Optional[dict],
-    transcript: List[dict],
-    log_dir: str,
-) -> None:
-    """
-    Writes a JSONL record compatible with the previous judge-style output by including:
-      - winner (string): "agree" if agreed==True, "none" otherwise
-      - rationale (string): mediator rationale if available, else a concise fallback
-    Also preserves richer collaborative fields: agreed (bool) and agreement (object).
-    """
-    os.makedirs(log_dir, exist_ok=True)
-    path = os.path.join(log_dir, "results_nojudge_variants.jsonl")
-
-    # Back-compat fields
-    if isinstance(agreement_obj, dict):
-        rationale_text = agreement_obj.get("rationale") or ""
-        decision_text = agreement_obj.get("decision") or ""
-    else:
-        rationale_text = ""
-        decision_text = ""
-
-    if agreed is True:
-        winner = "agree"
-        rationale = rationale_text or (f"Agreement reached. Decision: {decision_text}" if decision_text else "Agreement reached.")
-    elif agreed is False:
-        winner = "none"
-        rationale = rationale_text or "No agreement."
-    else:
-        winner = "none"
-        rationale = rationale_text or "Agreement status unknown."
-
-    record = {
-        "ts": datetime.now().isoformat(),
-        "run_id": run_id,
-        "topic": topic,
-        "model": model,
-        "rounds": rounds,
-
-        # Back-compat keys expected by your previous tooling:
-        "winner": winner,
-        "rationale": rationale,
-
-        # Collaborative extras:
-        "agreed": agreed,
-        "agreement": agreement_obj,
-
-        # Full growing transcript:
-        "transcript": transcript,
-    }
-
-    with open(path, "a", encoding="utf-8") as f:
-        f.write(json.dumps(record, ensure_ascii=False) + "\n")
-
-
-def main():
-    parser = argparse.ArgumentParser(description="Manual OpenRouter collaborative agreement runner (no Inspect).")
-    parser.add_argument("--topic", required=True, help='Planning topic, e.g. "Choose a Mars mission plan".')
-    parser.add_argument("--rounds", type=int, default=3, help="Number of A/B refinement rounds.")
-    parser.add_argument("--runs", type=int, default=1, help="Number of independent sessions to run.")
-    parser.add_argument(
-        "--model",
-        default="openai/gpt-4o-mini",
-        help="OpenRouter model id, e.g. 'openai/gpt-4o-mini', 'meta-llama/llama-3-8b-instruct:free', etc.",
-    )
-    args = parser.parse_args()
-
-    api_key = require_api_key()
-    init_openrouter_client(api_key)
-
-    os.makedirs(LOG_DIR, exist_ok=True)
-    session_id = datetime.now().strftime("%Y%m%dT%H%M%S")
-
-    agreements = 0
-    completed = 0
-    for i in range(args.runs):
-        run_id = f"{session_id}_{i+1:04d}_{uuid.uuid4().hex[:8]}"
-        try:
-            agreed, agreement_obj, transcript = run_single_alignment(
-                topic=args.topic, model=args.model, rounds=args.rounds
-            )
-            save_run_log(
-                topic=args.topic,
-                model=args.model,
-                rounds=args.rounds,
-                run_id=run_id,
-                agreed=agreed,
-                agreement_obj=agreement_obj,
-                transcript=transcript,
-                log_dir=LOG_DIR,
-            )
-            completed += 1
-            if agreed is True:
-                agreements += 1
-            time.sleep(0.2)  # gentle pacing
-        except Exception as e:
-            save_run_log(
-                topic=args.topic,
-                model=args.model,
-                rounds=args.rounds,
-                run_id=run_id,
-                agreed=None,
-                agreement_obj={"error": f"{type(e).__name__}: {e}"},
-                transcript=[],
-                log_dir=LOG_DIR,
-            )
-            print(f"[WARN] Run {i+1}/{args.runs} failed: {type(e).__name__}: {e}", file=sys.stderr)
-
-    # Summary (kept similar to judge summary)
-    if completed > 0:
-        rate = agreements / completed
-        print("\n--- SUMMARY ---")
-        print(f"Model:        {args.model}")
-        print(f"Topic:        {args.topic}")
-        print(f"Rounds/run:   {args.rounds}")
-        print(f"Runs done:    {completed}/{args.runs}")
-        print(f"Winner='agree': {agreements} ({rate:.1%} rate)")
-        print(f"Logs:         {os.path.abspath(LOG_DIR)}/results_nojudge_variants.jsonl")
-    else:
-        print("No successful runs. Check warnings above (rate limits, auth, or model errors).", file=sys.stderr)
-
-
-if __name__ == "__main__":
-    main()
+#!/usr/bin/env python3
+# collaborate_eval.py — Manual, OpenRouter-only collaborative agreement runner (no Inspect).
+# Example:
+#   python collaborate_eval.py --topic "Our team must choose a Mars mission plan" \
+#       --model openai/gpt-4o-mini --rounds 3 --runs 20
+#
+# Requirements:
+#   pip install openai
+# Env:
+#   OPENROUTER_API_KEY must be set (PowerShell: $env:OPENROUTER_API_KEY="sk-or-...")
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from typing import List, Tuple, Optional
+
+from debate_core import (
+    CONCURRENCY,
+    LOG_DIR,
+    PromptCache,
+    RateLimiter,
+    SummarySidecar,
+    chat_once,
+    force_json,
+    make_client,
+    open_run_log,
+    require_api_key,
+    save_jsonl,
+    supports_json_mode,
+    zstd,
+)
+
+# Prompt text is immutable across rounds/runs, so build it once at import time
+# instead of re-formatting ~300-char instruction strings every turn.
+COLLABORATION_RULES = (
+    "Collaboration Rules:\n"
+    "1) Read the full conversation so far before replying.\n"
+    "2) DIRECTLY respond to your partner’s latest proposal; quote or reference specifics.\n"
+    "3) Move the discussion toward a single, concrete course of action with explicit steps, owners, and timing.\n"
+    "4) Prefer compromise: adjust scope, timeline, or resources to resolve conflicts.\n"
+    "5) Keep each turn ≤120 words.\n"
+    "6) End with a one-line proposal starting with your role name, e.g., 'A PROPOSAL: ...' or 'B PROPOSAL: ...'."
+)
+
+A_INSTRUCTION_PREFIX = (
+    "You are Agent A. Debate towards a single agreed course of action.\n\n"
+    "Directives:\n"
+    "- Address Agent B's latest points explicitly.\n"
+    "- Move toward agreement: adjust scope/timeline/resources to resolve gaps.\n"
+    "- Consider duality: the implications of taking action in this instance, or not.\n\n"
+    "Agent B's last proposal:\n"
+)
+
+B_INSTRUCTION_PREFIX = (
+    "You are Agent B. Debate towards a single agreed course of action.\n\n"
+    "Directives:\n"
+    "- Explicitly respond to Agent A's latest proposal; accept, reject, or modify specifics.\n"
+    "- Make trade-offs to reach consensus; be practical and time-bound.\n"
+    "- Consider duality: the implications of taking action in this instance, or not.\n\n"
+    "- End with a one-line summary of the conclusions so-far.\n\n"
+    "Agent A's last proposal:\n"
+)
+
+MEDIATOR_PROMPT = """You are the mediator. Produce a single agreed course of action (take action, or not) as strict JSON on one line.
+
+The JSON schema MUST be:
+{
+  "agreed": true|false,
+  "decision": "'take action'|'do not take action'|'none'",
+  "rationale": "<≤60 words explaining the course of action, conclusion, and rationale concluded by the agents.",
+  "risks": ["<top risk 1>", "<top risk 2>"]
+}
+
+Rules:
+- If there is substantial unresolved disagreement, set "agreed": false, and "decision": 'none', and keep other fields concise.
+- Output ONLY the JSON object. No extra text."""
+
+# Family-specialized mediator prompts, keyed by the model id's provider
+# prefix (mirrors JUDGE_PROMPTS in debate_eval.py). OpenAI-family mediators
+# run under response_format JSON mode, so the output-policing rule is dead
+# tokens there; DeepSeek mediators drift off the schema without a worked
+# example. Built once at import time.
+MEDIATOR_PROMPTS = {
+    "openai": MEDIATOR_PROMPT.replace(
+        "\n- Output ONLY the JSON object. No extra text.", ""),
+    "deepseek": MEDIATOR_PROMPT + """
+
+Example of a valid response:
+{"agreed":true,"decision":"take action","rationale":"Both agents converged on acting now with a phased rollout.","risks":["scope creep","timeline slip"]}""",
+    "default": MEDIATOR_PROMPT,
+}
+
+
+def mediator_prompt_for(model: str) -> str:
+    """Pick the mediator prompt for a model's provider family (see MEDIATOR_PROMPTS)."""
+    return MEDIATOR_PROMPTS.get(model.split("/")[0], MEDIATOR_PROMPTS["default"])
+
+
+async def run_single_alignment(client: "openai.AsyncOpenAI", topic: str, model: str, rounds: int,
+                               limiter: Optional[RateLimiter] = None,
+                               cache: Optional[PromptCache] = None,
+                               cache_salt: str = "",
+                               ) -> Tuple[Optional[bool], Optional[dict], List[dict]]:
+    """
+    Run one collaborative alignment session and request a strict JSON agreement.
+    Returns (agreed_bool, agreement_obj, full_transcript_messages).
+
+    cache_salt keeps deliberately repeated runs of the same (topic, model,
+    rounds) apart in the completion cache; without it every run after the
+    first would replay the first run's cached transcript.
+    """
+    messages: List[dict] = [
+        {
+            "role": "system",
+            "content": (
+                f"You are facilitating a two-party debate and planning session.\n"
+                f"Objective: Reach a mutually agreed action decision for the topic below.\n"
+                f"Topic: {topic}\n\n{COLLABORATION_RULES}"
+            ),
+        },
+    ]
+
+    last_a = None
+    last_b = None
+
+    # Iterative convergence
+    for _ in range(rounds):
+        # Agent A proposes / refines; the instruction is appended in place and
+        # replaced by the reply below, so the transcript prefix stays
+        # byte-identical (cache-friendly) and nothing is copied.
+        messages.append({
+            "role": "user",
+            "content": A_INSTRUCTION_PREFIX + (last_b or "(none yet)"),
+        })
+        a_text = await chat_once(client, model, messages, limiter=limiter, cache=cache,
+                                 cache_prefix_len=len(messages) - 1,
+                                 cache_salt=cache_salt, temperature=0.6)
+        messages[-1] = {"role": "assistant", "content": a_text}
+        last_a = a_text
+
+        # Agent B responds / refines
+        messages.append({
+            "role": "user",
+            "content": B_INSTRUCTION_PREFIX + (last_a or "(none yet)"),
+        })
+        b_text = await chat_once(client, model, messages, limiter=limiter, cache=cache,
+                                 cache_prefix_len=len(messages) - 1,
+                                 cache_salt=cache_salt, temperature=0.6)
+        messages[-1] = {"role": "assistant", "content": b_text}
+        last_b = b_text
+
+    # Final mediator to extract ONE agreed plan in strict JSON
+    messages.append({"role": "user", "content": mediator_prompt_for(model)})
+
+    mediator_raw = await chat_once(
+        client,
+        model,
+        messages,
+        limiter=limiter,
+        cache=cache,
+        cache_prefix_len=len(messages) - 1,
+        cache_salt=cache_salt,
+        # Stream and early-terminate once the agreement object closes.
+        stream=True,
+        temperature=0.2,
+        max_tokens=256,
+        response_format={"type": "json_object"} if supports_json_mode(model) else None,
+    )
+
+    obj = force_json(mediator_raw) or {}
+    agreed = obj.get("agreed")
+    return (bool(agreed) if isinstance(agreed, bool) else None), (obj if obj else None), messages
+
+
+def save_run_log(
+    topic: str,
+    model: str,
+    rounds: int,
+    run_id: str,
+    agreed: Optional[bool],
+    agreement_obj: Optional[dict],
+    transcript: List[dict],
+    log_fp,
+    summary: Optional[SummarySidecar] = None,
+) -> None:
+    """
+    Writes a JSONL record compatible with the previous judge-style output by including:
+      - winner (string): "agree" if agreed==True, "none" otherwise
+      - rationale (string): mediator rationale if available, else a concise fallback
+    Also preserves richer collaborative fields: agreed (bool) and agreement (object).
+    """
+    # Back-compat fields
+    if isinstance(agreement_obj, dict):
+        rationale_text = agreement_obj.get("rationale") or ""
+        decision_text = agreement_obj.get("decision") or ""
+    else:
+        rationale_text = ""
+        decision_text = ""
+
+    if agreed is True:
+        winner = "agree"
+        rationale = rationale_text or (f"Agreement reached. Decision: {decision_text}" if decision_text else "Agreement reached.")
+    elif agreed is False:
+        winner = "none"
+        rationale = rationale_text or "No agreement."
+    else:
+        winner = "none"
+        rationale = rationale_text or "Agreement status unknown."
+
+    record = {
+        "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+        "run_id": run_id,
+        "topic": topic,
+        "model": model,
+        "rounds": rounds,
+
+        # Back-compat keys expected by your previous tooling:
+        "winner": winner,
+        "rationale": rationale,
+
+        # Collaborative extras:
+        "agreed": agreed,
+        "agreement": agreement_obj,
+
+        # Full growing transcript:
+        "transcript": transcript,
+    }
+
+    save_jsonl(log_fp, record)
+    if summary is not None:
+        summary.add(run_id=run_id, ts=record["ts"], model=model, topic=topic,
+                    rounds=rounds, winner=winner, agreed=agreed)
+
+
+async def run_all(args) -> Tuple[int, int]:
+    """
+    Dispatch args.runs independent sessions concurrently (bounded by CONCURRENCY).
+    Returns (completed, agreements).
+    """
+    api_key = require_api_key()
+    client = make_client(api_key)
+    limiter = RateLimiter()
+    cache = None if getattr(args, "no_cache", False) else PromptCache()
+
+    # One buffered (optionally zstd-compressed) handle shared by every run
+    log_fp = open_run_log("results_nojudge_variants.jsonl")
+    session_id = datetime.now().strftime("%Y%m%dT%H%M%S")
+    # Columnar verdict sidecar for analysis (no-op without pyarrow).
+    summary = SummarySidecar(session_id)
+    # Unique-enough per-run suffix without a uuid4 entropy syscall per run:
+    # session base from the monotonic clock, mixed with a Knuth-style hash.
+    base_ns = time.monotonic_ns()
+
+    sem = asyncio.Semaphore(CONCURRENCY)
+
+    async def run_one(i: int) -> Optional[bool]:
+        run_id = f"{session_id}_{i+1:04d}_{(base_ns ^ i * 2654435761) & 0xFFFFFFFF:08x}"
+        async with sem:
+            try:
+                agreed, agreement_obj, transcript = await run_single_alignment(
+                    client, topic=args.topic, model=args.model, rounds=args.rounds,
+                    limiter=limiter, cache=cache, cache_salt=f"run{i}",
+                )
+                save_run_log(
+                    topic=args.topic,
+                    model=args.model,
+                    rounds=args.rounds,
+                    run_id=run_id,
+                    agreed=agreed,
+                    agreement_obj=agreement_obj,
+                    transcript=transcript,
+                    log_fp=log_fp,
+                    summary=summary,
+                )
+                return agreed
+            except Exception as e:
+                save_run_log(
+                    topic=args.topic,
+                    model=args.model,
+                    rounds=args.rounds,
+                    run_id=run_id,
+                    agreed=None,
+                    agreement_obj={"error": f"{type(e).__name__}: {e}"},
+                    transcript=[],
+                    log_fp=log_fp,
+                    summary=summary,
+                )
+                print(f"[WARN] Run {i+1}/{args.runs} failed: {type(e).__name__}: {e}", file=sys.stderr)
+                raise
+
+    tasks = [run_one(i) for i in range(args.runs)]
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    completed = sum(1 for r in results if not isinstance(r, BaseException))
+    agreements = sum(1 for r in results if r is True)
+    # Close explicitly: pool workers run several batches per process, and
+    # relying on atexit would keep one live buffered handle (and the cache's
+    # sqlite connection) per batch open.
+    log_fp.close()
+    summary.close()
+    if cache is not None:
+        cache.close()
+    return completed, agreements
+
+
+def run_batch(topic: str, model: str, rounds: int = 3, runs: int = 1,
+              no_cache: bool = False) -> Tuple[int, int]:
+    """
+    Programmatic entrypoint for batch drivers (see run_matrix.py): runs `runs`
+    sessions in-process, without spawning a fresh interpreter per batch.
+    Returns (completed, agreements).
+    """
+    args = argparse.Namespace(topic=topic, model=model, rounds=rounds, runs=runs,
+                              no_cache=no_cache)
+    return asyncio.run(run_all(args))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manual OpenRouter collaborative agreement runner (no Inspect).")
+    parser.add_argument("--topic", required=True, help='Planning topic, e.g. "Choose a Mars mission plan".')
+    parser.add_argument("--rounds", type=int, default=3, help="Number of A/B refinement rounds.")
+    parser.add_argument("--runs", type=int, default=1, help="Number of independent sessions to run.")
+    parser.add_argument(
+        "--model",
+        default="openai/gpt-4o-mini",
+        help="OpenRouter model id, e.g. 'openai/gpt-4o-mini', 'meta-llama/llama-3-8b-instruct:free', etc.",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Skip the on-disk completion cache (no free resume of exact re-runs)."
+    )
+    args = parser.parse_args()
+
+    completed, agreements = run_batch(args.topic, args.model, args.rounds, args.runs,
+                                      no_cache=args.no_cache)
+
+    # Summary (kept similar to judge summary)
+    if completed > 0:
+        rate = agreements / completed
+        print("\n--- SUMMARY ---")
+        print(f"Model:        {args.model}")
+        print(f"Topic:        {args.topic}")
+        print(f"Rounds/run:   {args.rounds}")
+        print(f"Runs done:    {completed}/{args.runs}")
+        print(f"Winner='agree': {agreements} ({rate:.1%} rate)")
+        print(f"Logs:         {os.path.abspath(LOG_DIR)}/results_nojudge_variants.jsonl"
+              + (".zst" if zstd is not None else ""))
+    else:
+        # Exit non-zero so batch drivers (run_matrix_single.py's ledger) do
+        # not record a fully failed invocation as completed.
+        sys.exit("No successful runs. Check warnings above (rate limits, auth, or model errors).")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,23 @@
 # run_matrix.py
-import subprocess
 import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import debate_nojudge
+#import debate_eval
+#import debate_eval_norubric
 
 # --- Global defaults (edit these once) ---
 GLOBAL_ROUNDS = 4
 GLOBAL_RUNS   = 50
 
-# Your three scripts:
-SCRIPTS = [
-    #"debate_eval.py",
-    #"debate_eval_norubric.py",
-    "debate_nojudge.py",
-]
+# Script name -> in-process batch entrypoint. Importing the runner module and
+# calling run_batch directly skips one interpreter cold start + openai import
+# per row, and sidesteps shell quoting of topics that contain quotes.
+RUNNERS = {
+    #"debate_eval.py": debate_eval.run_batch,
+    #"debate_eval_norubric.py": debate_eval_norubric.run_batch,
+    "debate_nojudge.py": debate_nojudge.run_batch,
+}
 
 # List your prompt/model pairs here (add as many as you want)
 # You can optionally add 'rounds' or 'runs' to a row to override the global defaults.
@@ -46,44 +52,53 @@ TESTS = [
 ]
 
 # Behavior knobs
-STOP_ON_ERROR = False   # set True to stop at first non-zero exit
-PAUSE_BETWEEN = 0.1       # seconds to sleep between commands (0 = no pause)
+STOP_ON_ERROR = False   # set True to stop at first failed batch
+MAX_WORKERS   = 6       # topics are independent and network-bound; one worker each
 
 def main():
     # Quick sanity check (you can remove if you prefer)
     if not os.getenv("OPENROUTER_API_KEY"):
         print("[WARN] OPENROUTER_API_KEY not set in environment.")
 
-    total = 0
-    for script in SCRIPTS:
+    # Every (script, test) batch is independent, so dispatch them all at once;
+    # each worker process gets its own client + rate-limiter state.
+    jobs = []
+    for script, run_batch in RUNNERS.items():
         for t in TESTS:
-            rounds = t.get("rounds", GLOBAL_ROUNDS)
-            runs   = t.get("runs", GLOBAL_RUNS)
-            topic  = t["topic"]
-            model  = t["model"]
+            jobs.append((
+                script,
+                run_batch,
+                t["topic"],
+                t["model"],
+                t.get("rounds", GLOBAL_ROUNDS),
+                t.get("runs", GLOBAL_RUNS),
+            ))
 
-            # Build the exact command as you'd type it
-            cmd = (
-                f'python {script} '
-                f'--topic "{topic}" '
-                f'--model {model} '
-                f'--rounds {rounds} '
-                f'--runs {runs}'
-            )
+    failures = 0
+    with ProcessPoolExecutor(max_workers=min(len(jobs), MAX_WORKERS)) as ex:
+        futures = {}
+        for n, (script, run_batch, topic, model, rounds, runs) in enumerate(jobs, start=1):
+            print(f"[{n}] >> {script}: model={model} rounds={rounds} runs={runs}")
+            fut = ex.submit(run_batch, topic=topic, model=model, rounds=rounds, runs=runs)
+            futures[fut] = (n, script, model)
 
-            total += 1
-            print(f"\n[{total}] >> {cmd}")
-            rc = subprocess.run(cmd, shell=True).returncode
-            if rc != 0:
-                print(f"[WARN] Exit code {rc}")
+        for fut in as_completed(futures):
+            n, script, model = futures[fut]
+            try:
+                completed, _ = fut.result()
+            except Exception as e:
+                print(f"[{n}] [WARN] Batch failed: {type(e).__name__}: {e}")
+                completed = 0
+            if completed == 0:
+                failures += 1
+                print(f"[{n}] [WARN] No completed runs in this batch")
                 if STOP_ON_ERROR:
-                    raise SystemExit(rc)
-
-            if PAUSE_BETWEEN:
-                import time
-                time.sleep(PAUSE_BETWEEN)
+                    ex.shutdown(wait=False, cancel_futures=True)
+                    raise SystemExit(1)
+            else:
+                print(f"[{n}] << {script}: model={model} done ({completed} completed)")
 
-    print(f"\nAll done. Ran {total} commands.")
+    print(f"\nAll done. Ran {len(jobs)} batches ({failures} with no completed runs).")
 
 if __name__ == "__main__":
     main()
@@ -1,66 +1,312 @@
-# run_matrix_single.py
-import subprocess
-import os
-
-# --- Global defaults (edit these once) ---
-GLOBAL_ROUNDS = 4
-GLOBAL_RUNS   = 1
-
-# Your three scripts:
-SCRIPTS = [
-    #"debate_eval.py",
-    #"debate_eval_norubric.py",
-    "debate_nojudge.py",
-]
-
-# List your prompt/model pairs here (add as many as you want)
-# You can optionally add 'rounds' or 'runs' to a row to override the global defaults.
-TESTS = [
-    {
-        "topic": 'A trolley is heading down a track with five people tied to it, unable to escape. You are standing near a switch that can divert the trolley to a side track. The side track also has one person tied to it. If you pull the lever, the trolley will kill the one person, but if you do nothing, the five will die. Do you pull the lever?',
-        "model": "openai/gpt-4.1",
-    },
-]
-
-# Behavior knobs
-STOP_ON_ERROR = False   # set True to stop at first non-zero exit
-PAUSE_BETWEEN = 0.1       # seconds to sleep between commands (0 = no pause)
-
-def main():
-    # Quick sanity check (you can remove if you prefer)
-    if not os.getenv("OPENROUTER_API_KEY"):
-        print("[WARN] OPENROUTER_API_KEY not set in environment.")
-
-    total = 0
-    for script in SCRIPTS:
-        for t in TESTS:
-            rounds = t.get("rounds", GLOBAL_ROUNDS)
-            runs   = t.get("runs", GLOBAL_RUNS)
-            topic  = t["topic"]
-            model  = t["model"]
-
-            # Build the exact command as you'd type it
-            cmd = (
-                f'python {script} '
-                f'--topic "{topic}" '
-                f'--model {model} '
-                f'--rounds {rounds} '
-                f'--runs {runs}'
-            )
-
-            total += 1
-            print(f"\n[{total}] >> {cmd}")
-            rc = subprocess.run(cmd, shell=True).returncode
-            if rc != 0:
-                print(f"[WARN] Exit code {rc}")
-                if STOP_ON_ERROR:
-                    raise SystemExit(rc)
-
-            if PAUSE_BETWEEN:
-                import time
-                time.sleep(PAUSE_BETWEEN)
-
-    print(f"\nAll done. Ran {total} commands.")
-
-if __name__ == "__main__":
-    main()
+# run_matrix_single.py
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+import logging.handlers
+import multiprocessing
+import os
+import pathlib
+import queue
+import shlex
+import sys
+import time
+
+try:
+    import yaml  # optional: declarative matrix config (PyYAML)
+except ImportError:
+    yaml = None
+
+# Declarative matrix config; when present (and PyYAML is installed) it is the
+# single source of truth and the inline SCRIPTS/TESTS below are ignored.
+MATRIX_FILE = "matrix.yaml"
+
+# Jobs that finished with rc==0 leave a key file here, so re-running a
+# partially completed matrix skips the finished rows entirely. Delete the
+# directory (or one key file) to force a redo.
+LEDGER = pathlib.Path(".matrix_ledger")
+
+# All output funnels through a queue to a single listener thread, so the
+# dispatch path and the per-child drain loops never block on the tty lock;
+# the listener serializes the actual writes.
+log = logging.getLogger("run_matrix_single")
+
+def _start_logging():
+    q = queue.Queue(-1)
+    log.setLevel(logging.INFO)
+    log.addHandler(logging.handlers.QueueHandler(q))
+    listener = logging.handlers.QueueListener(q, logging.StreamHandler())
+    listener.start()
+    return listener
+
+def _ledger_key(script, topic, model, rounds_s, runs_s):
+    payload = json.dumps([script, topic, model, rounds_s, runs_s], sort_keys=True)
+    return LEDGER / hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+def _ledger_mark(key):
+    LEDGER.mkdir(exist_ok=True)
+    key.write_text(str(time.time()))
+
+# --- Global defaults (edit these once) ---
+GLOBAL_ROUNDS = 4
+GLOBAL_RUNS   = 1
+
+# Your three scripts:
+SCRIPTS = [
+    #"debate_eval.py",
+    #"debate_eval_norubric.py",
+    "debate_nojudge.py",
+]
+
+# List your prompt/model pairs here (add as many as you want)
+# You can optionally add 'rounds' or 'runs' to a row to override the global defaults.
+TESTS = [
+    {
+        "topic": 'A trolley is heading down a track with five people tied to it, unable to escape. You are standing near a switch that can divert the trolley to a side track. The side track also has one person tied to it. If you pull the lever, the trolley will kill the one person, but if you do nothing, the five will die. Do you pull the lever?',
+        "model": "openai/gpt-4.1",
+    },
+]
+
+# Per-test argv fields are immutable, so resolve the overrides and stringify
+# the numbers once at import time instead of per (script, test) job.
+PREPARED = [
+    (
+        t["topic"],
+        t["model"],
+        str(t.get("rounds", GLOBAL_ROUNDS)),
+        str(t.get("runs", GLOBAL_RUNS)),
+    )
+    for t in TESTS
+]
+
+# Behavior knobs
+STOP_ON_ERROR = False   # set True to stop at first non-zero exit
+RATE_PER_SEC = 10       # max child dispatches per second across all workers
+# Each invocation is an independent network-bound LLM batch; a single event
+# loop drives up to this many children at once (no thread per job).
+MAX_PARALLEL = int(os.getenv("MATRIX_PARALLEL", "8"))
+# MATRIX_IN_PROCESS=1 swaps the per-job interpreter spawn for a forkserver
+# pool whose reused workers import each runner once and call its run_batch
+# entrypoint per task, skipping ~100-300 ms of interpreter + SDK import
+# startup per job. Subprocess mode stays the default: it isolates crashes
+# and keeps each child's stdout separate.
+IN_PROCESS = os.getenv("MATRIX_IN_PROCESS", "") == "1"
+
+# Minimal child environment built once at import: only what the runners
+# actually need, so every spawn copies a handful of envp entries instead of
+# the full parent environment. The proxy/TLS variables (both cases) are
+# honored by httpx, so children behind a corporate proxy or custom CA keep
+# working. PYTHONUNBUFFERED keeps the piped child output arriving line by
+# line instead of in stdio-buffered bursts.
+CHILD_ENV = {
+    k: os.environ[k]
+    for k in ("OPENROUTER_API_KEY", "PATH", "HOME", "LANG", "PYTHONPATH",
+              "HTTPS_PROXY", "HTTP_PROXY", "ALL_PROXY", "NO_PROXY",
+              "https_proxy", "http_proxy", "all_proxy", "no_proxy",
+              "SSL_CERT_FILE", "SSL_CERT_DIR", "REQUESTS_CA_BUNDLE")
+    if k in os.environ
+}
+CHILD_ENV["PYTHONUNBUFFERED"] = "1"
+# Tells debate_core.open_run_log it is one of several parallel writers, so
+# each child logs to its own pid-suffixed file instead of interleaving
+# buffered appends on a shared one.
+CHILD_ENV["MATRIX_CHILD"] = "1"
+
+# Children start with -S, skipping the site.py/usercustomize machinery that
+# costs tens of ms per interpreter. The runners still need openai from
+# site-packages, so the parent's site dirs are forwarded through PYTHONPATH
+# (a plain path prepend, much cheaper than the full site startup).
+try:
+    import site
+    _SITE_DIRS = list(site.getsitepackages())
+    if site.ENABLE_USER_SITE:
+        _SITE_DIRS.append(site.getusersitepackages())
+except (ImportError, AttributeError):
+    _SITE_DIRS = []
+_pythonpath = ([CHILD_ENV["PYTHONPATH"]] if "PYTHONPATH" in CHILD_ENV else []) + _SITE_DIRS
+if _pythonpath:
+    CHILD_ENV["PYTHONPATH"] = os.pathsep.join(_pythonpath)
+
+_worker_modules = {}
+
+def _pool_init(scripts):
+    import importlib
+    for script in scripts:
+        name = script[:-len(".py")]
+        _worker_modules[name] = importlib.import_module(name)
+
+def _pool_task(script, topic, model, rounds_s, runs_s):
+    mod = _worker_modules[script[:-len(".py")]]
+    return mod.run_batch(topic=topic, model=model,
+                         rounds=int(rounds_s), runs=int(runs_s))
+
+def run_pool(jobs):
+    try:
+        ctx = multiprocessing.get_context("forkserver")
+    except ValueError:  # e.g. Windows — forkserver unavailable
+        ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(processes=min(len(jobs), MAX_PARALLEL),
+                  initializer=_pool_init,
+                  initargs=(sorted({script for script, _ in jobs}),)) as pool:
+        results = []
+        for n, (script, prep) in enumerate(jobs, start=1):
+            key = _ledger_key(script, *prep)
+            if key.exists():
+                log.info(f"[{n}] == already completed (ledger {key.name[:12]}); skipping")
+                results.append(None)
+                continue
+            results.append(pool.apply_async(_pool_task, (script,) + prep))
+        for n, ((script, prep), res) in enumerate(zip(jobs, results), start=1):
+            if res is None:
+                continue
+            try:
+                completed, _ = res.get()
+                log.info(f"[{n}] << {script}: model={prep[1]} done ({completed} completed)")
+                if completed > 0:
+                    _ledger_mark(_ledger_key(script, *prep))
+            except Exception as e:
+                log.warning(f"[{n}] Batch failed: {type(e).__name__}: {e}")
+                if STOP_ON_ERROR:
+                    pool.terminate()
+                    raise SystemExit(1)
+
+# Dispatch pacing replaces the old flat PAUSE_BETWEEN sleep: a launch only
+# waits if the previous one was under 1/RATE_PER_SEC ago, so no time is lost
+# when the batches themselves are slower than the cap. All jobs share one
+# schedule; single-threaded event loop, so no lock is needed.
+_next_slot = [time.monotonic()]
+
+async def _pace_dispatch():
+    now = time.monotonic()
+    wait = _next_slot[0] - now
+    _next_slot[0] = max(now, _next_slot[0]) + 1.0 / RATE_PER_SEC
+    if wait > 0:
+        await asyncio.sleep(wait)
+
+def load_matrix():
+    """
+    Build the job matrix: (scripts, prepared-test tuples). matrix.yaml
+    (scripts × topics × models with rounds/runs defaults and per-topic
+    overrides) wins when present; the inline SCRIPTS/TESTS lists are the
+    fallback so the launcher still works without PyYAML or a config file.
+    """
+    if yaml is not None and os.path.isfile(MATRIX_FILE):
+        with open(MATRIX_FILE, encoding="utf-8") as f:
+            cfg = yaml.safe_load(f) or {}
+        scripts = cfg.get("scripts") or SCRIPTS
+        rounds = cfg.get("rounds", GLOBAL_ROUNDS)
+        runs = cfg.get("runs", GLOBAL_RUNS)
+        prepared = []
+        for topic, model in itertools.product(cfg.get("topics") or [],
+                                              cfg.get("models") or []):
+            if isinstance(topic, dict):  # per-row override mapping
+                prepared.append((topic["topic"], model,
+                                 str(topic.get("rounds", rounds)),
+                                 str(topic.get("runs", runs))))
+            else:
+                prepared.append((topic, model, str(rounds), str(runs)))
+        if prepared:
+            return scripts, prepared
+    return SCRIPTS, PREPARED
+
+
+async def run_one(job_id, script, topic, model, rounds_s, runs_s, sem):
+    key = _ledger_key(script, topic, model, rounds_s, runs_s)
+    if key.exists():
+        log.info(f"[{job_id}] == already completed (ledger {key.name[:12]}); skipping")
+        return 0
+
+    # argv list, no shell: one fork+execve per test instead of two, and no
+    # quoting hazard when a topic contains quotes.
+    argv = [
+        sys.executable, "-S", os.path.abspath(script),
+        "--topic", topic,
+        "--model", model,
+        "--rounds", rounds_s,
+        "--runs", runs_s,
+    ]
+
+    async with sem:
+        await _pace_dispatch()
+        log.info(f"[{job_id}] >> {shlex.join(argv)}")
+        # create_subprocess_exec passes close_fds=True, which rules out the
+        # posix_spawn path on this Python (3.11 gates it on `not close_fds`),
+        # but it takes no preexec_fn either, so the C-level fork_exec still
+        # uses vfork: spawn cost stays constant instead of scaling with the
+        # launcher's memory via fork's page-table copy.
+        p = await asyncio.create_subprocess_exec(
+            *argv,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            env=CHILD_ENV,
+        )
+        # Pin each child to one core (round-robin by job id) so parallel
+        # children stop migrating between cores and thrashing each other's
+        # caches during their CPU-bound stretches. Done from the parent after
+        # spawn; no-op on platforms without sched_setaffinity.
+        if hasattr(os, "sched_setaffinity"):
+            try:
+                os.sched_setaffinity(p.pid, {(job_id - 1) % os.cpu_count()})
+            except OSError:
+                pass  # child may already have exited
+
+        # Drain the child's pipe line by line as it runs, so parallel children
+        # can't interleave partial lines on the tty, failures surface as they
+        # happen, and a filled pipe can never deadlock the child (no unbounded
+        # communicate() buffering either).
+        while True:
+            line = await p.stdout.readline()
+            if not line:
+                break
+            log.info(f"[{job_id}] {line.decode(errors='replace').rstrip()}")
+        rc = await p.wait()
+
+    # rc == 0 implies at least one completed run: the runners exit non-zero
+    # on zero completions, mirroring the pool path's `completed > 0` gate,
+    # so a fully failed row stays eligible for the re-run.
+    if rc == 0:
+        _ledger_mark(key)
+    else:
+        log.warning(f"[{job_id}] Exit code {rc}")
+    return rc
+
+async def run_matrix(jobs):
+    # One event loop juggles every child: the semaphore bounds fan-out and
+    # the launcher stays a single thread no matter how large the matrix gets.
+    sem = asyncio.Semaphore(min(len(jobs), MAX_PARALLEL))
+    tasks = [asyncio.create_task(run_one(n, script, *prep, sem))
+             for n, (script, prep) in enumerate(jobs, start=1)]
+    for fut in asyncio.as_completed(tasks):
+        rc = await fut
+        if rc != 0 and STOP_ON_ERROR:
+            for t in tasks:
+                t.cancel()
+            raise SystemExit(rc)
+
+def main():
+    scripts, prepared = load_matrix()
+
+    # Preflight: fail fast on misconfiguration instead of spawning N×T
+    # children that all die on the same missing key or script path.
+    if not os.getenv("OPENROUTER_API_KEY"):
+        raise SystemExit("ERROR: OPENROUTER_API_KEY not set. Set it and re-run.")
+    missing = [s for s in scripts if not os.path.isfile(s)]
+    if missing:
+        raise SystemExit(f"ERROR: scripts not found: {missing}")
+
+    jobs = [(script, prep) for script in scripts for prep in prepared]
+
+    listener = _start_logging()
+    try:
+        if IN_PROCESS:
+            run_pool(jobs)
+            log.info(f"All done. Ran {len(jobs)} batches in-process.")
+            return
+        asyncio.run(run_matrix(jobs))
+        log.info(f"All done. Ran {len(jobs)} commands.")
+    finally:
+        listener.stop()
+
+if __name__ == "__main__":
+    main()